@@ -0,0 +1,64 @@
+# cython: language_level=3
+"""GPLEV0 polling loop in C for the laser harp (optional accelerator).
+
+Build on the Pi with ``cythonize -i _poll.pyx``; laser_harp.py falls back to
+the pure-Python loop when this module is not compiled.
+"""
+
+from cpython.exc cimport PyErr_CheckSignals
+from libc.errno cimport errno
+from libc.stdint cimport uint32_t
+from posix.fcntl cimport O_RDONLY, O_SYNC, open as c_open
+from posix.mman cimport MAP_FAILED, MAP_SHARED, PROT_READ, mmap, munmap
+from posix.time cimport nanosleep, timespec
+from posix.unistd cimport close
+
+
+cdef extern from *:
+    int __builtin_ctz(unsigned int x) nogil
+
+
+# GPLEV0 在 GPIO 寄存器块里的偏移 0x34，按 32 位字计是第 13 个
+cdef enum:
+    GPLEV0_WORD = 13  # 0x34 / 4
+    MAP_SIZE = 4096
+
+
+def poll_edges(uint32_t mask, uint32_t last, callback, long interval_ns=1000000):
+    """一直扫描 GPLEV0，对 mask 内每个 LOW -> HIGH 的位调用 callback(pin)。
+
+    扫描和睡眠都不持有 GIL；每轮拿回 GIL 检查一次信号，Ctrl+C 照常生效。
+    """
+    cdef int fd = c_open(b"/dev/gpiomem", O_RDONLY | O_SYNC)
+    if fd < 0:
+        raise OSError(errno, "cannot open /dev/gpiomem")
+    cdef void *base = mmap(NULL, MAP_SIZE, PROT_READ, MAP_SHARED, fd, 0)
+    close(fd)
+    if base == MAP_FAILED:
+        raise OSError(errno, "cannot mmap /dev/gpiomem")
+
+    cdef volatile uint32_t *gplev0 = <volatile uint32_t *>base + GPLEV0_WORD
+    cdef uint32_t current, changed, bit
+    cdef timespec delay
+    delay.tv_sec = interval_ns // 1000000000
+    delay.tv_nsec = interval_ns % 1000000000
+
+    last &= mask
+    try:
+        while True:
+            with nogil:
+                nanosleep(&delay, NULL)
+                current = gplev0[0] & mask
+
+            changed = current ^ last
+            last = current
+            while changed:
+                bit = changed & (~changed + 1)
+                # 置位 = HIGH = 激光照到接收器
+                if current & bit:
+                    callback(__builtin_ctz(bit))
+                changed ^= bit
+
+            PyErr_CheckSignals()
+    finally:
+        munmap(base, MAP_SIZE)
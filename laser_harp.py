@@ -2,14 +2,19 @@
 
 from __future__ import annotations
 
+import collections
 import importlib
-import importlib.util
-import queue
+import mmap
+import os
+import select
 import threading
 import time
 from dataclasses import dataclass, field
 from typing import Dict, Iterable, List, Sequence
 
+# 击中时打印编号会阻塞在 stdout 上，默认关闭；设 LASER_HARP_DEBUG=1 打开
+DEBUG_PRINT = __debug__ and bool(os.environ.get("LASER_HARP_DEBUG"))
+
 
 # =========================
 # 配置数据结构
@@ -37,12 +42,61 @@ class LaserHarpConfig:
     debounce_ms: int = 60
     oled_width: int = 128
     oled_height: int = 64
+    gpio_chip: str = "gpiochip0"
 
 
 # =========================
 # PWM 播放器
 # =========================
 
+# Mary Had a Little Lamb (E D C D E E E | D D D | E G G | E D C D E E E | E D D E D C)
+_C4, _D4, _E4, _G4 = 261.63, 293.66, 329.63, 392.00
+_MARY_PHRASE = (_E4, _D4, _C4, _D4, _E4, _E4, _E4)
+_MARY_MELODY: tuple[float, ...] = (
+    _MARY_PHRASE
+    + (_D4, _D4, _D4)
+    + (_E4, _G4, _G4)
+    + _MARY_PHRASE
+    + (_E4, _D4, _D4, _E4, _D4, _C4)
+)
+
+
+class SpscRing:
+    """单生产者/单消费者环形缓冲，只依赖 GIL，不加锁。
+
+    满了不阻塞也不报错：生产者照写，消费者发现落后超过一圈就跳到最新的
+    size 项，旧的直接丢掉。
+    """
+
+    __slots__ = ("buf", "mask", "head", "tail")
+
+    def __init__(self, size: int = 64):
+        if size <= 0 or size & (size - 1):
+            raise ValueError("SpscRing size must be a power of two")
+        self.buf: List[float] = [0.0] * size
+        self.mask = size - 1
+        self.head = 0  # 只由生产者写
+        self.tail = 0  # 只由消费者写
+
+    def put(self, value: float) -> None:
+        self.buf[self.head & self.mask] = value
+        self.head += 1
+
+    def empty(self) -> bool:
+        return self.tail == self.head
+
+    def get(self) -> float | None:
+        head = self.head
+        if self.tail == head:
+            return None
+        # 落后超过一圈：跳到仍在环里的最老一项
+        if head - self.tail > self.mask + 1:
+            self.tail = head - (self.mask + 1)
+        value = self.buf[self.tail & self.mask]
+        self.tail += 1
+        return value
+
+
 class PWMNotePlayer:
     def __init__(
         self,
@@ -58,9 +112,16 @@ class PWMNotePlayer:
         self.note_duration = note_duration
         self.note_gap = note_gap
 
-        self._queue: "queue.Queue[float]" = queue.Queue()
+        # 弹得比音符播放快时只留最近几个音，不积压旧输入
+        self._ring = SpscRing(4)
+        # 后台旋律直接在 worker 里播，不再经过队列
+        self._background: tuple[float, ...] = ()
+        self._background_duration = note_duration
+        self._background_pos = 0
         self._worker = threading.Thread(target=self._worker_loop, daemon=True)
         self._running = threading.Event()
+        # 有新音符或要退出时唤醒 worker，空闲时不轮询
+        self._wake = threading.Event()
 
         # 喇叭引脚必须先设为输出，再创建 PWM
         self.gpio.setup(self.speaker_pin, self.gpio.OUT)
@@ -72,64 +133,229 @@ class PWMNotePlayer:
 
     def stop(self) -> None:
         self._running.clear()
-        # 唤醒线程，避免一直阻塞在 get()
-        try:
-            self._queue.put_nowait(0.0)
-        except queue.Full:
-            pass
+        self._wake.set()
         self._worker.join(timeout=1.0)
         self._pwm.stop()
 
     def play_note(self, frequency: float) -> None:
-        self._queue.put(frequency)
+        self._ring.put(frequency)
+        self._wake.set()
+
+    def set_background(self, sequence: Sequence[float], note_duration: float) -> None:
+        # 队列空闲时循环播放；play_note 来的音优先，下一个音符就插进来
+        self._background = tuple(sequence)
+        self._background_duration = note_duration
+        self._background_pos = 0
 
     def _worker_loop(self) -> None:
-        while self._running.is_set():
-            try:
-                frequency = self._queue.get(timeout=0.2)
-            except queue.Empty:
+        # 比轮询线程低一档，保证采样优先
+        raise_thread_priority(10)
+
+        # 循环里用到的属性提前绑定
+        ring = self._ring
+        wake = self._wake
+        running = self._running.is_set
+        play = self._play
+        note_duration = self.note_duration
+
+        while running():
+            frequency = ring.get()
+            if frequency is not None:
+                play(frequency, note_duration, preemptible=False)
                 continue
 
-            if frequency > 0:
-                self._pwm.ChangeFrequency(frequency)
-                self._pwm.start(self.duty_cycle)
-                time.sleep(self.note_duration)
-                self._pwm.stop()
-                if self.note_gap > 0:
-                    time.sleep(self.note_gap)
+            # 先 clear 再确认 ring 为空：put 之后的 set 不会丢，
+            # 上一个音留下的 set 也不会被误当成抢占
+            wake.clear()
+            if not ring.empty():
+                continue
+
+            background = self._background
+            if background:
+                pos = self._background_pos % len(background)
+                self._background_pos = pos + 1
+                play(background[pos], self._background_duration, preemptible=True)
+            else:
+                wake.wait()
+
+    def _play(self, frequency: float, duration: float, preemptible: bool) -> None:
+        if frequency <= 0:
+            return
+        self._pwm.ChangeFrequency(frequency)
+        self._pwm.start(self.duty_cycle)
+        held = self._hold(duration, preemptible)
+        self._pwm.stop()
+        if held and self.note_gap > 0:
+            self._hold(self.note_gap, preemptible)
 
-            self._queue.task_done()
+    def _hold(self, duration: float, preemptible: bool) -> bool:
+        # 代替 time.sleep：stop() 立刻打断；后台音还会被新音符抢占
+        # 返回 False 表示没等满
+        deadline = time.monotonic() + duration
+        while self._running.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            if self._wake.wait(remaining):
+                if preemptible:
+                    return False
+                # 按键音不可抢占：新音符留在 ring 里，播完再取
+                self._wake.clear()
+        return False
 
 
 # =========================
 # OLED 显示
 # =========================
 
+# 5x7 ASCII 字模（0x20-0x7F），每字 5 列，每列一个字节，LSB 在上
+_FONT_5X7 = bytes.fromhex(
+    "0000000000 00005f0000 0007000700 147f147f14 242a7f2a12 2313086462 3649552250 0005030000"  # 0x20-0x27
+    "001c224100 0041221c00 14083e0814 08083e0808 0050300000 0808080808 0060600000 2010080402"  # 0x28-0x2f
+    "3e5149453e 00427f4000 4261514946 2141454b31 1814127f10 2745454539 3c4a494930 0171090503"  # 0x30-0x37
+    "3649494936 064949291e 0036360000 0056360000 0814224100 1414141414 0041221408 0201510906"  # 0x38-0x3f
+    "324979413e 7e1111117e 7f49494936 3e41414122 7f4141221c 7f49494941 7f09090101 3e41415132"  # 0x40-0x47
+    "7f0808087f 00417f4100 2040413f01 7f08142241 7f40404040 7f0204027f 7f0408107f 3e4141413e"  # 0x48-0x4f
+    "7f09090906 3e4151215e 7f09192946 4649494931 01017f0101 3f4040403f 1f2040201f 7f2018207f"  # 0x50-0x57
+    "6314081463 0304780403 6151494543 007f414100 0204081020 0041417f00 0402010204 4040404040"  # 0x58-0x5f
+    "0001020400 2054545478 7f48444438 3844444420 384444487f 3854545418 087e090102 0c5252523e"  # 0x60-0x67
+    "7f08040478 00447d4000 2040443d00 007f102844 00417f4000 7c04180478 7c08040478 3844444438"  # 0x68-0x6f
+    "7c14141408 081414187c 7c08040408 4854545420 043f444020 3c4040207c 1c2040201c 3c4030403c"  # 0x70-0x77
+    "4428102844 0c5050503c 4464544c44 0008364100 00007f0000 0041360800 0804081008 0000000000"  # 0x78-0x7f
+)
+
+# 展开成 8x8：5 列字形 + 3 列空白，一个字正好占一页 8 个字节
+FONT_8X8 = b"".join(
+    _FONT_5X7[i : i + 5] + bytes(3) for i in range(0, len(_FONT_5X7), 5)
+)
+
+
 class OLEDDisplay:
-    def __init__(self, width: int, height: int):
-        board = load_module("board")
-        adafruit_ssd1306 = load_module("adafruit_ssd1306")
-        pil_image = load_module("PIL.Image")
-        pil_draw = load_module("PIL.ImageDraw")
-        pil_font = load_module("PIL.ImageFont")
+    GLYPH_WIDTH = 8
+
+    def __init__(self, width: int, height: int, bus: int = 1, address: int = 0x3C):
+        smbus2 = load_module("smbus2")
 
         self.width = width
         self.height = height
+        self.address = address
+        self._pages = height // 8
+        self._col_offset = (128 - width) // 2
+
+        self._i2c_msg = smbus2.i2c_msg
+        self._bus = smbus2.SMBus(bus)
+        # 页序帧缓冲：page * width + x，每个字节是一列 8 个像素
+        # 前面多留一个 0x40（数据模式）字节，整帧可以直接块写
+        self._frame = bytearray(1 + width * self._pages)
+        self._frame[0] = 0x40
+        self._buffer = memoryview(self._frame)[1:]
+        self._last_lines: tuple[str, ...] | None = None
+        # 预先渲染好的画面：key -> (lines, 帧缓冲字节)
+        self._cache: Dict[str, tuple[tuple[str, ...], bytes]] = {}
+
+        self._command(
+            0xAE,                           # 关显示
+            0xD5, 0x80,                     # 时钟分频
+            0xA8, height - 1,               # 复用率
+            0xD3, 0x00,                     # 显示偏移
+            0x40,                           # 起始行
+            0x8D, 0x14,                     # 电荷泵
+            0x20, 0x00,                     # 水平寻址
+            0xA1, 0xC8,                     # 段/COM 翻转
+            0xDA, 0x12 if height == 64 else 0x02,
+            0x81, 0xCF,                     # 对比度
+            0xD9, 0xF1,                     # 预充电
+            0xDB, 0x40,                     # VCOMH
+            0xA4, 0xA6,                     # 跟随 RAM，正常显示
+            0xAF,                           # 开显示
+        )
 
-        self._image = pil_image.new("1", (width, height))
-        self._draw = pil_draw.Draw(self._image)
-        self._font = pil_font.load_default()
-
-        i2c = board.I2C()
-        self._display = adafruit_ssd1306.SSD1306_I2C(width, height, i2c)
+    def draw_text(self, x: int, page: int, text: str) -> None:
+        buffer = self._buffer
+        pos = page * self.width + x
+        end = (page + 1) * self.width
+        for ch in text:
+            if pos + self.GLYPH_WIDTH > end:
+                break
+            code = ord(ch) - 0x20
+            if not 0 <= code < 96:
+                code = ord("?") - 0x20
+            glyph = code * self.GLYPH_WIDTH
+            buffer[pos : pos + self.GLYPH_WIDTH] = FONT_8X8[glyph : glyph + self.GLYPH_WIDTH]
+            pos += self.GLYPH_WIDTH
+
+    def prerender(self, key: str, lines: Iterable[str]) -> None:
+        lines = tuple(lines)
+        saved = bytes(self._buffer)
+        self._render(lines, range(self._pages))
+        self._cache[key] = (lines, bytes(self._buffer))
+        self._buffer[:] = saved
+
+    def show_cached(self, key: str) -> None:
+        lines, frame = self._cache[key]
+        if lines == self._last_lines:
+            return
+        self._buffer[:] = frame
+        self._push(lines)
 
     def show_lines(self, lines: Iterable[str]) -> None:
-        self._draw.rectangle((0, 0, self.width, self.height), outline=0, fill=0)
-        for idx, line in enumerate(lines):
-            y = idx * 12
-            self._draw.text((0, y), line, font=self._font, fill=255)
-        self._display.image(self._image)
-        self._display.show()
+        lines = tuple(lines)
+        if lines == self._last_lines:
+            return
+        if self._last_lines is None:
+            self._render(lines, range(self._pages))
+        else:
+            self._render(lines, self._dirty_pages(self._last_lines, lines))
+        self._push(lines)
+
+    def close(self) -> None:
+        self._bus.close()
+
+    def _render(self, lines: tuple[str, ...], pages: Iterable[int]) -> None:
+        # 每行一页：先清掉该页，再把字模拷进去
+        for page in pages:
+            start = page * self.width
+            self._buffer[start : start + self.width] = bytes(self.width)
+            if page < len(lines):
+                self.draw_text(0, page, lines[page])
+
+    def _push(self, lines: tuple[str, ...]) -> None:
+        if self._last_lines is None:
+            self.flush(0, self._pages - 1)
+        else:
+            dirty = self._dirty_pages(self._last_lines, lines)
+            if dirty:
+                self.flush(dirty[0], dirty[-1])
+        self._last_lines = lines
+
+    def _dirty_pages(self, old: tuple[str, ...], new: tuple[str, ...]) -> List[int]:
+        return [
+            page
+            for page in range(min(max(len(old), len(new)), self._pages))
+            if page >= len(old) or page >= len(new) or old[page] != new[page]
+        ]
+
+    def flush(self, first_page: int, last_page: int) -> None:
+        # 窗口命令和数据放进同一次 I2C_RDWR，一次 ioctl 发完
+        start = first_page * self.width
+        end = (last_page + 1) * self.width
+        if start == 0:
+            data = self._frame[: end + 1]
+        else:
+            data = b"\x40" + self._buffer[start:end]
+
+        write = self._i2c_msg.write
+        self._bus.i2c_rdwr(
+            write(self.address, [
+                0x00,
+                0x21, self._col_offset, self._col_offset + self.width - 1,
+                0x22, first_page, last_page,
+            ]),
+            write(self.address, data),
+        )
+
+    def _command(self, *commands: int) -> None:
+        self._bus.write_i2c_block_data(self.address, 0x00, list(commands))
 
 
 # =========================
@@ -137,6 +363,16 @@ class OLEDDisplay:
 # =========================
 
 class LaserHarp:
+    # OLED 只会出现这几屏，启动时预渲染
+    SCREENS: Dict[str, tuple[str, ...]] = {
+        "ready": ("Laser Harp Ready", "Link Start!"),
+        "sequence_found": ("Sequence found!", "Key: 4925,12546"),
+    }
+
+    # 旋律匹配用的多项式滚动哈希
+    _HASH_BASE = 31
+    _HASH_MOD = (1 << 61) - 1
+
     def __init__(self, config: LaserHarpConfig):
         self.config = config
 
@@ -144,14 +380,43 @@ class LaserHarp:
         self.gpio.setmode(self.gpio.BCM)
         self.gpio.setwarnings(False)
 
-        self._note_by_receiver: Dict[int, NoteConfig] = {
-            n.receiver_pin: n for n in self.config.notes
-        }
-        self._debug_index_by_receiver: Dict[int, int] = {
-            n.receiver_pin: idx + 1 for idx, n in enumerate(self.config.notes)
+        # BCM 引脚号很小，直接按引脚号下标查表，不走 dict 哈希
+        pin_slots = max([27] + [n.receiver_pin for n in self.config.notes]) + 1
+        self._note_by_pin: List[NoteConfig | None] = [None] * pin_slots
+        self._debug_idx_by_pin: List[int] = [0] * pin_slots
+        for idx, n in enumerate(self.config.notes):
+            self._note_by_pin[n.receiver_pin] = n
+            self._debug_idx_by_pin[n.receiver_pin] = idx + 1
+        self._note_freq_by_pin = tuple(
+            n.frequency if n else 0.0 for n in self._note_by_pin
+        )
+        # 软件去抖：同一个脚 debounce_ms 内的重复触发直接丢掉
+        self._last_hit_ns: List[int] = [0] * pin_slots
+        self._debounce_ns = self.config.debounce_ms * 1_000_000
+
+        # 旋律匹配：音名换成小整数 id，滑动窗口 + 滚动哈希，每个音 O(1)
+        self._note_id: Dict[str, int] = {
+            n.name: idx for idx, n in enumerate(self.config.notes)
         }
+        self._note_id_by_pin: List[int] = [-1] * pin_slots
+        for n in self.config.notes:
+            self._note_id_by_pin[n.receiver_pin] = self._note_id[n.name]
+        # 目标里出现未配置的音名时用 -1，永远匹配不上
+        target_ids = [
+            self._note_id.get(name, -1) for name in self.config.target_sequence
+        ]
+        target_len = len(target_ids)
+        # 目标也存成 deque，确认匹配时 deque 直接比较，不用每次拼 tuple
+        self._target_window = collections.deque(target_ids, maxlen=target_len)
+        self._target_hash = 0
+        for note_id in target_ids:
+            self._target_hash = (
+                self._target_hash * self._HASH_BASE + note_id
+            ) % self._HASH_MOD
+        self._base_pow_len = pow(self._HASH_BASE, target_len, self._HASH_MOD)
+        self._rolling_hash = 0
+        self._window: collections.deque[int] = collections.deque(maxlen=target_len)
 
-        self._melody_progress: List[str] = []
         self._note_player = PWMNotePlayer(
             self.gpio,
             speaker_pin=self.config.speaker_pin,
@@ -160,111 +425,287 @@ class LaserHarp:
             note_gap=self.config.note_gap,
         )
         self._display: OLEDDisplay | None = None
-        self._melody_thread = threading.Thread(target=self._melody_loop, daemon=True)
-        self._melody_running = threading.Event()
 
-        # 轮询需要记住每个接收脚的状态
+        # 轮询需要记住每个接收脚的状态（与 _receiver_pins 同序）
         self._receiver_pins: List[int] = [n.receiver_pin for n in self.config.notes]
-        self._last_states: Dict[int, int] = {}
+        self._last_states: List[int] = [0] * len(self._receiver_pins)
+
+        # 有 libgpiod 时改为内核边沿事件，不再轮询
+        self._event_lines = None
+        self._epoll: select.epoll | None = None
+        self._fd_to_line: Dict[int, tuple] = {}
+
+        # 没有 libgpiod 时，优先直接读 GPLEV0 寄存器，一次拿到全部电平
+        self._gpiomem: mmap.mmap | None = None
+        self._gplev0: memoryview | None = None
+        self._watch_mask = 0
+        self._last_mask = 0
 
     def setup(self) -> None:
         # 配置激光发射管（统一输出）& 接收器
         self.gpio.setup(self.config.laser_pin, self.gpio.OUT)
         self.gpio.output(self.config.laser_pin, self.gpio.HIGH)
 
-        for note in self.config.notes:
+        for idx, note in enumerate(self.config.notes):
             # 接收：输入，上拉
             self.gpio.setup(note.receiver_pin, self.gpio.IN, pull_up_down=self.gpio.PUD_UP)
-            self._last_states[note.receiver_pin] = self.gpio.input(note.receiver_pin)
+            self._last_states[idx] = self.gpio.input(note.receiver_pin)
+
+        self._event_lines = self._request_event_lines()
+        if self._event_lines is None:
+            self._gplev0 = self._map_level_register()
+            if self._gplev0 is not None:
+                self._watch_mask = sum(1 << pin for pin in self._receiver_pins)
+                self._last_mask = self._gplev0[0] & self._watch_mask
 
-        # 启动声音线程
+        # 启动声音线程，后台旋律由它自己播
+        self._note_player.set_background(_MARY_MELODY, self.config.note_duration)
         self._note_player.start()
-        self._melody_running.set()
-        self._melody_thread.start()
 
         # 初始化 OLED
         self._display = OLEDDisplay(self.config.oled_width, self.config.oled_height)
-        self._display.show_lines(["Laser Harp Ready", "Link Start!"])
+        for key, lines in self.SCREENS.items():
+            self._display.prerender(key, lines)
+        self._display.show_cached("ready")
 
     def loop(self) -> None:
-        # 主循环：轮询接收脚，检测从 LOW -> HIGH 的变化
+        raise_thread_priority(20)
+
+        if self._event_lines is not None:
+            self._event_loop()
+        elif self._gplev0 is not None:
+            # 编译过 _poll.pyx 就用 C 版扫描，否则用 Python 版
+            poll = load_optional_module("_poll")
+            if poll is not None:
+                poll.poll_edges(self._watch_mask, self._last_mask, self._on_beam_hit)
+            else:
+                self._mask_poll_loop()
+        else:
+            self._poll_loop()
+
+    def _request_event_lines(self):
+        # 只支持 libgpiod v1 的 Python 绑定；不可用时返回 None，退回轮询
+        gpiod = load_optional_module("gpiod")
+        if gpiod is None or not hasattr(gpiod, "LINE_REQ_EV_RISING_EDGE"):
+            return None
+
+        try:
+            chip = gpiod.Chip(self.config.gpio_chip)
+            lines = chip.get_lines(self._receiver_pins)
+            # 只要上升沿 = 激光照到接收器
+            lines.request(consumer="laser-harp", type=gpiod.LINE_REQ_EV_RISING_EDGE)
+        except OSError:
+            return None
+
+        # 每条线一个事件 fd，统一挂到一个 epoll 上
+        self._epoll = select.epoll()
+        for line, pin in zip(lines, self._receiver_pins):
+            fd = line.event_get_fd()
+            self._epoll.register(fd, select.EPOLLIN)
+            self._fd_to_line[fd] = (line, pin)
+        return lines
+
+    def _event_loop(self) -> None:
+        # 阻塞在 epoll 里等内核报边沿事件，空闲时不占 CPU
+        poll = self._epoll.poll
+        fd_to_line = self._fd_to_line
+        on_beam_hit = self._on_beam_hit
         while True:
-            for pin in self._receiver_pins:
-                state = self.gpio.input(pin)
-                last = self._last_states[pin]
+            for fd, _ in poll():
+                line, pin = fd_to_line[fd]
+                line.event_read()
+                on_beam_hit(pin)
+
+    def _map_level_register(self) -> memoryview | None:
+        # BCM283x/BCM2711：GPLEV0（偏移 0x34）是 GPIO0-31 的电平寄存器
+        if any(pin > 31 for pin in self._receiver_pins):
+            return None
+
+        try:
+            fd = os.open("/dev/gpiomem", os.O_RDONLY | os.O_SYNC)
+        except OSError:
+            return None
+        try:
+            self._gpiomem = mmap.mmap(fd, mmap.PAGESIZE, prot=mmap.PROT_READ)
+        except OSError:
+            return None
+        finally:
+            os.close(fd)
 
-                if state != last:
-                    self._last_states[pin] = state
+        return memoryview(self._gpiomem)[0x34:0x38].cast("I")
+
+    def _mask_poll_loop(self) -> None:
+        # 一次 32 位读取代替逐脚 gpio.input，XOR 找出变化的位
+        gplev0 = self._gplev0
+        watch_mask = self._watch_mask
+        on_beam_hit = self._on_beam_hit
+        sleep = time.sleep
+
+        while True:
+            current = gplev0[0] & watch_mask
+            changed = current ^ self._last_mask
+            self._last_mask = current
+
+            while changed:
+                bit = changed & -changed
+                # 置位 = HIGH = 激光照到接收器
+                if current & bit:
+                    on_beam_hit(bit.bit_length() - 1)
+                changed ^= bit
+
+            sleep(0.01)
+
+    def _poll_loop(self) -> None:
+        # 轮询接收脚，检测从 LOW -> HIGH 的变化
+        # 热路径上的属性查找提前绑定成局部变量
+        gpio_input = self.gpio.input
+        high = self.gpio.HIGH
+        last = self._last_states
+        indexed_pins = list(enumerate(self._receiver_pins))
+        on_beam_hit = self._on_beam_hit
+        sleep = time.sleep
+
+        while True:
+            for idx, pin in indexed_pins:
+                state = gpio_input(pin)
+                if state != last[idx]:
+                    last[idx] = state
 
                     # HIGH 视为激光照到接收器
-                    if state == self.gpio.HIGH:
-                        self._on_beam_hit(pin)
+                    if state == high:
+                        on_beam_hit(pin)
 
-            time.sleep(0.01)
+            sleep(0.01)
 
     def cleanup(self) -> None:
         # 尽量保证多次调用也不会出问题
         try:
-            self._melody_running.clear()
             self._note_player.stop()
         except Exception:
             pass
 
+        try:
+            if self._display:
+                self._display.close()
+        except Exception:
+            pass
+
+        try:
+            if self._epoll is not None:
+                self._epoll.close()
+            if self._event_lines is not None:
+                self._event_lines.release()
+        except Exception:
+            pass
+
+        try:
+            if self._gplev0 is not None:
+                self._gplev0.release()
+                self._gplev0 = None
+            if self._gpiomem is not None:
+                self._gpiomem.close()
+                self._gpiomem = None
+        except Exception:
+            pass
+
         try:
             self.gpio.cleanup()
         except Exception:
             pass
 
     def _on_beam_hit(self, pin: int) -> None:
-        note = self._note_by_receiver.get(pin)
-        if not note:
+        if self._note_by_pin[pin] is None:
             return
 
-        debug_index = self._debug_index_by_receiver.get(pin)
-        if debug_index is not None:
-            print(debug_index)
+        now = time.monotonic_ns()
+        if now - self._last_hit_ns[pin] < self._debounce_ns:
+            return
+        self._last_hit_ns[pin] = now
 
-        self._note_player.play_note(note.frequency)
-        self._update_melody(note.name)
+        if DEBUG_PRINT:
+            print(self._debug_idx_by_pin[pin])
 
-    def _update_melody(self, note_name: str) -> None:
-        self._melody_progress.append(note_name)
-        L = len(self.config.target_sequence)
-        self._melody_progress = self._melody_progress[-L:]
+        self._note_player.play_note(self._note_freq_by_pin[pin])
+        self._update_melody(self._note_id_by_pin[pin])
 
-        if tuple(self._melody_progress) == tuple(self.config.target_sequence):
+    def _update_melody(self, note_id: int) -> None:
+        window = self._window
+        # 目标为空时永远不匹配
+        if not window.maxlen:
+            return
+        # 窗口满了，最老的音会被挤出去，从哈希里减掉它的贡献
+        dropped = window[0] if len(window) == window.maxlen else 0
+        window.append(note_id)
+        self._rolling_hash = (
+            self._rolling_hash * self._HASH_BASE
+            - dropped * self._base_pow_len
+            + note_id
+        ) % self._HASH_MOD
+
+        # 哈希相等再逐个确认，排除碰撞
+        if self._rolling_hash == self._target_hash and window == self._target_window:
             if self._display:
-                self._display.show_lines(
-                    ["Sequence found!", "Key: 4925,12546"]
-                )
-
-    def _melody_loop(self) -> None:
-        # Mary Had a Little Lamb (E D C D E E E | D D D | E G G | E D C D E E E | E D D E D C)
-        melody = [
-            329.63, 293.66, 261.63, 293.66, 329.63, 329.63, 329.63,
-            293.66, 293.66, 293.66,
-            329.63, 392.00, 392.00,
-            329.63, 293.66, 261.63, 293.66, 329.63, 329.63, 329.63,
-            329.63, 293.66, 293.66, 329.63, 293.66, 261.63,
-        ]
-        while self._melody_running.is_set():
-            for frequency in melody:
-                if not self._melody_running.is_set():
-                    break
-                self._note_player.play_note(frequency)
-                time.sleep(self.config.note_duration + self.config.note_gap)
+                self._display.show_cached("sequence_found")
 
 
 # =========================
 # 工具函数 & main
 # =========================
 
+def _import_or_error(module_name: str):
+    # 导入失败时返回异常本身，等真正用到时再抛
+    # RPi.GPIO 在非树莓派上导入会抛 RuntimeError
+    try:
+        return importlib.import_module(module_name)
+    except (ImportError, RuntimeError) as exc:
+        return exc
+
+
+# 模块加载时一次性导入硬件依赖，避免启动时反复 find_spec 扫 sys.path
+_PRELOADED = {
+    name: _import_or_error(name) for name in ("RPi.GPIO", "smbus2", "gpiod", "_poll")
+}
+
+
+def _lookup_module(module_name: str):
+    module = _PRELOADED.get(module_name)
+    if module is None:
+        module = _PRELOADED[module_name] = _import_or_error(module_name)
+    return module
+
+
 def load_module(module_name: str):
-    if importlib.util.find_spec(module_name) is None:
+    module = _lookup_module(module_name)
+    if isinstance(module, ImportError):
         raise ModuleNotFoundError(
             f"Module '{module_name}' is required but was not found. Install it."
-        )
-    return importlib.import_module(module_name)
+        ) from module
+    if isinstance(module, BaseException):
+        raise module
+    return module
+
+
+def load_optional_module(module_name: str):
+    module = _lookup_module(module_name)
+    if isinstance(module, BaseException):
+        return None
+    return module
+
+
+def raise_thread_priority(priority: int, niceness: int = -10) -> None:
+    # 把调用线程切到 SCHED_FIFO（Linux 上 pid 0 即当前线程），需要 CAP_SYS_NICE
+    # 没有权限就退而调 nice；都不行就保持默认调度
+    if hasattr(os, "sched_setscheduler"):
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+            return
+        except PermissionError:
+            pass
+
+    try:
+        os.nice(niceness)
+    except (AttributeError, PermissionError):
+        pass
 
 
 def default_config() -> LaserHarpConfig: